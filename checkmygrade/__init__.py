@@ -2,6 +2,11 @@ __all__ = [
 	"models",
 	"storage",
 	"services",
+	"search",
+	"grading",
+	"cache",
+	"changes",
 	"crypto",
+	"metrics",
 	"cli",
 ]
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+from .metrics import METRICS
+
+
+class ResultCache:
+	"""LRU memo for query results, bounded by entry count and total weight.
+
+	Callers fold a data version into the key, so entries computed before a
+	write are simply never asked for again and age out under LRU pressure.
+	``weight`` is the caller's size measure (rows for reports); entries heavier
+	than ``max_weight`` are not cached at all.
+	"""
+
+	def __init__(self, maxsize: int = 256, name: str = "cache", max_weight: Optional[int] = None):
+		if maxsize < 0:
+			raise ValueError("maxsize must be >= 0")
+		self.maxsize = maxsize
+		self.max_weight = max_weight
+		self.name = name
+		self.hits = 0
+		self.misses = 0
+		self.weight = 0
+		self._data: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+
+	def __len__(self) -> int:
+		return len(self._data)
+
+	def get(self, key: Hashable) -> Tuple[bool, Any]:
+		entry = self._data.get(key)
+		if entry is None:
+			self.misses += 1
+			METRICS.inc(f"{self.name}.miss")
+			return False, None
+		self._data.move_to_end(key)
+		self.hits += 1
+		METRICS.inc(f"{self.name}.hit")
+		return True, entry[0]
+
+	def put(self, key: Hashable, value: Any, weight: int = 1) -> None:
+		if self.maxsize == 0 or (self.max_weight is not None and weight > self.max_weight):
+			return
+		old = self._data.pop(key, None)
+		if old is not None:
+			self.weight -= old[1]
+		self._data[key] = (value, weight)
+		self.weight += weight
+		while len(self._data) > self.maxsize or (self.max_weight is not None and self.weight > self.max_weight):
+			_, (_, w) = self._data.popitem(last=False)
+			self.weight -= w
+
+	def clear(self) -> None:
+		self._data.clear()
+		self.weight = 0
+
+	def stats(self) -> dict:
+		return {
+			"hits": self.hits,
+			"misses": self.misses,
+			"size": len(self._data),
+			"maxsize": self.maxsize,
+			"weight": self.weight,
+			"max_weight": self.max_weight,
+		}
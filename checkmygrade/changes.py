@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from itertools import islice
+from types import MappingProxyType
+from typing import Callable, Deque, List, Mapping, Optional
+
+from .metrics import METRICS
+
+
+class ResyncRequired(LookupError):
+	"""Raised when the requested sequence is no longer (or not yet) in the feed."""
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+	seq: int
+	op: str  # "add" | "update" | "delete" | "resync"
+	key: str
+	row: Optional[Mapping[str, object]] = None  # read-only; shared by all consumers
+	epoch: str = ""
+
+
+class ChangeFeed:
+	"""Bounded, in-process log of row changes with monotonically increasing seq.
+
+	Sequence numbers are only meaningful within one feed instance, which is
+	identified by a random ``epoch``. Out-of-process consumers store
+	``(epoch, seq)`` and pass both back to ``changes_since``. A different epoch
+	(e.g. after a restart) raises ``ResyncRequired``.
+
+	Consumers poll ``changes_since(epoch, last_seen_seq)`` or ``subscribe`` for push
+	delivery; subscriber exceptions are counted in ``subscriber_errors`` and
+	never propagate to the writer. Only the latest ``maxlen`` events are
+	retained; a consumer that falls behind gets ``ResyncRequired`` and should
+	re-read the full table, then continue from ``seq``.
+	"""
+
+	def __init__(self, maxlen: int = 10000):
+		if maxlen < 1:
+			raise ValueError("maxlen must be >= 1")
+		self.maxlen = maxlen
+		self.epoch = uuid.uuid4().hex
+		self._seq = 0
+		self._floor = 0  # oldest seq a consumer can resume from
+		self._events: Deque[ChangeEvent] = deque(maxlen=maxlen)
+		self._subscribers: List[Callable[[ChangeEvent], object]] = []
+		self.subscriber_errors = 0
+		self.last_subscriber_error: Optional[Exception] = None
+
+	@property
+	def seq(self) -> int:
+		return self._seq
+
+	def record(self, op: str, key: str, row: Optional[dict] = None) -> ChangeEvent:
+		self._seq += 1
+		# Events are shared by the buffer and every subscriber, so the payload
+		# is frozen: one consumer cannot alter what the others see.
+		frozen = MappingProxyType(dict(row)) if row is not None else None
+		event = ChangeEvent(self._seq, op, key, frozen, self.epoch)
+		if len(self._events) == self.maxlen:
+			self._floor = self._events[0].seq
+		self._events.append(event)
+		self._publish(event)
+		return event
+
+	def skip(self, count: int) -> ChangeEvent:
+		"""Account for ``count`` changes without buffering them.
+
+		Used for bulk writes that would overflow the feed anyway: every
+		consumer behind the new seq is forced to resync, and subscribers get a
+		single "resync" event.
+		"""
+		self._seq += count
+		self._floor = self._seq
+		self._events.clear()
+		event = ChangeEvent(self._seq, "resync", "", None, self.epoch)
+		self._publish(event)
+		return event
+
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		if epoch != self.epoch:
+			raise ResyncRequired(f"feed epoch {epoch!r} is not the current epoch {self.epoch!r}")
+		if seq < self._floor or seq > self._seq:
+			raise ResyncRequired(f"seq {seq} outside retained range [{self._floor}, {self._seq}]")
+		if not self._events:
+			return []
+		start = seq - self._events[0].seq + 1
+		return list(islice(self._events, max(start, 0), None))
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		"""Deliver each future event to ``callback``; returns an unsubscribe function."""
+		self._subscribers.append(callback)
+
+		def unsubscribe() -> None:
+			if callback in self._subscribers:
+				self._subscribers.remove(callback)
+
+		return unsubscribe
+
+	def _publish(self, event: ChangeEvent) -> None:
+		# The event is already buffered and the write already persisted, so a
+		# failing subscriber must not abort the caller or starve the others.
+		for callback in list(self._subscribers):
+			try:
+				callback(event)
+			except Exception as e:
+				self.subscriber_errors += 1
+				self.last_subscriber_error = e
+				METRICS.inc("changes.subscriber_errors")
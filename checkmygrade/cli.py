@@ -3,6 +3,7 @@ from __future__ import annotations
 import sys
 from typing import Optional
 
+from .metrics import METRICS
 from .models import Student, Course
 from .services import StudentService, CourseService, ProfessorService, GradeService, AuthService
 
@@ -14,6 +15,7 @@ class CLI:
 		self.professors = ProfessorService()
 		self.grades = GradeService()
 		self.auth = AuthService()
+		self.grades.on_change(self.students.regrade_all)
 
 	def run(self) -> None:
 		while True:
@@ -25,6 +27,8 @@ class CLI:
 			print("5. Search Student by Email (timed)")
 			print("6. Course Stats (avg/median)")
 			print("7. Register/Login User")
+			print("8. Metrics (enable/dump/profile)")
+			print("9. Search Students by Name (prefix/fuzzy, timed)")
 			print("0. Exit")
 			choice = input("Select: ").strip()
 			if choice == "1":
@@ -41,6 +45,10 @@ class CLI:
 				self._course_stats()
 			elif choice == "7":
 				self._auth_flow()
+			elif choice == "8":
+				self._metrics_flow()
+			elif choice == "9":
+				self._search_name_timed()
 			elif choice == "0":
 				print("Bye.")
 				return
@@ -87,11 +95,52 @@ class CLI:
 		for s in res:
 			print(f"{s.email_address} -> {s.first_name} {s.last_name}, {s.course_id}, {s.marks}")
 
+	def _search_name_timed(self) -> None:
+		query = input("Name or partial name: ").strip()
+		import time
+		start = time.perf_counter()
+		res = self.students.search_name_prefix(query, limit=20)
+		mode = "prefix"
+		if not res:
+			res = [s for s, _ in self.students.search_name_fuzzy(query, limit=20)]
+			mode = "fuzzy"
+		elapsed = time.perf_counter() - start
+		print(f"{mode.capitalize()} search took {elapsed:.6f}s; found {len(res)} record(s)")
+		for s in res:
+			print(f"{s.email_address} -> {s.first_name} {s.last_name}, {s.course_id}, {s.marks}")
+
 	def _course_stats(self) -> None:
 		cid = input("Course ID: ").strip()
 		avg, med = self.students.stats_for_course(cid)
 		print(f"avg={avg} median={med}")
 
+	def _metrics_flow(self) -> None:
+		state = "on" if METRICS.enabled else "off"
+		print(f"Metrics are {state}.")
+		print("1) Toggle 2) Dump JSON 3) Dump Prometheus 4) Start profiling 5) Stop profiling 6) Reset")
+		c = input(": ").strip()
+		if c == "1":
+			if METRICS.enabled:
+				METRICS.disable()
+				print("Metrics disabled.")
+			else:
+				METRICS.enable()
+				print("Metrics enabled.")
+		elif c == "2":
+			print(METRICS.to_json())
+		elif c == "3":
+			print(METRICS.to_prometheus(), end="")
+		elif c == "4":
+			METRICS.start_profiling()
+			print("Profiling started.")
+		elif c == "5":
+			print(METRICS.stop_profiling() or "Profiler not running.")
+		elif c == "6":
+			METRICS.reset()
+			print("Reset.")
+		else:
+			print("Invalid.")
+
 	def _auth_flow(self) -> None:
 		print("1) Register 2) Login 3) Change Password")
 		c = input(": ").strip()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import bisect
+import math
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .models import Grade
+
+_RANGE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*(?:-|–|to)\s*(\d+(?:\.\d+)?)\s*$")
+_AT_LEAST = re.compile(r"^\s*(?:>=\s*(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*\+)\s*$")
+_BELOW = re.compile(r"^\s*<(=?)\s*(\d+(?:\.\d+)?)\s*$")
+
+
+def parse_marks_range(text: str) -> Tuple[float, float]:
+	"""Parse a ``Grade.marks_range`` string into ``(low, high)``.
+
+	Accepts "90-100", "90 to 100", ">=90", "90+", "<60" (exclusive) and
+	"<=59" (inclusive).
+	"""
+	m = _RANGE.match(text)
+	if m:
+		lo, hi = float(m.group(1)), float(m.group(2))
+		if lo > hi:
+			lo, hi = hi, lo
+		return lo, hi
+	m = _AT_LEAST.match(text)
+	if m:
+		return float(m.group(1) or m.group(2)), float("inf")
+	m = _BELOW.match(text)
+	if m:
+		hi = float(m.group(2))
+		# bounds are inclusive, so "<60" becomes the largest float below 60
+		return float("-inf"), hi if m.group(1) else math.nextafter(hi, float("-inf"))
+	raise ValueError(f"unrecognised marks_range: {text!r}")
+
+
+class RegradeResult(NamedTuple):
+	changed: int  # rows whose grade was rewritten
+	ungraded: int  # rows whose marks fall outside every band; grade left as-is
+
+
+class GradingTable:
+	"""Marks -> letter lookup compiled once from a set of grade bands.
+
+	Bands are sorted by lower bound. A band whose upper bound is within one
+	mark of the next band's lower bound ("80-89" then "90-100") is treated as
+	reaching up to it, so 89.5 is a B. Wider gaps are real: marks in them, or
+	outside every band, map to None. Overlapping bands are rejected.
+	"""
+
+	def __init__(self, grades: Iterable[Grade]):
+		bands: List[Tuple[float, float, str]] = []
+		for g in grades:
+			lo, hi = parse_marks_range(g.marks_range)
+			bands.append((lo, hi, g.grade))
+		bands.sort()
+		for (lo_a, hi_a, letter_a), (lo_b, _, letter_b) in zip(bands, bands[1:]):
+			if lo_a == lo_b:
+				raise ValueError(f"grade bands {letter_a!r} and {letter_b!r} share lower bound {lo_a}")
+			if lo_b < hi_a:
+				raise ValueError(f"grade bands {letter_a!r} and {letter_b!r} overlap")
+		self._lows = [b[0] for b in bands]
+		self._letters = [b[2] for b in bands]
+		# Highest mark each band accepts; bisect already stops below the next lo.
+		self._caps = [
+			float("inf") if nxt is not None and nxt[0] - hi <= 1 else hi
+			for (_, hi, _), nxt in zip(bands, bands[1:] + [None])
+		]
+
+	def __len__(self) -> int:
+		return len(self._lows)
+
+	def letter_for(self, marks: float) -> Optional[str]:
+		i = bisect.bisect_right(self._lows, marks) - 1
+		if i < 0 or marks > self._caps[i]:
+			return None
+		return self._letters[i]
+
+	def letters_for(self, marks: Iterable[float]) -> List[Optional[str]]:
+		"""Batch lookup; repeated mark values are resolved once."""
+		memo: dict = {}
+		out: List[Optional[str]] = []
+		for m in marks:
+			letter = memo.get(m, memo)
+			if letter is memo:
+				letter = memo[m] = self.letter_for(m)
+			out.append(letter)
+		return out
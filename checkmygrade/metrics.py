@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import bisect
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import re
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Latency bucket upper bounds in seconds (Prometheus-style, cumulative on export).
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+class Histogram:
+	def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+		self.buckets = buckets
+		self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+		self.count = 0
+		self.sum = 0.0
+
+	def observe(self, value: float) -> None:
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.count += 1
+		self.sum += value
+
+	def snapshot(self) -> dict:
+		return {
+			"count": self.count,
+			"sum": self.sum,
+			"buckets": {str(b): c for b, c in zip(self.buckets, self.counts)},
+			"+Inf": self.counts[-1],
+		}
+
+
+class Metrics:
+	"""Counters, latency histograms and optional profiling/tracing hooks.
+
+	Disabled by default; every hook checks ``enabled`` first so the cost of
+	an instrumented call is a single attribute lookup when turned off.
+	"""
+
+	def __init__(self, enabled: bool = False):
+		self.enabled = enabled
+		self._counters: Dict[str, float] = {}
+		self._histograms: Dict[str, Histogram] = {}
+		self._profiler: Optional[cProfile.Profile] = None
+		self._tracer: Optional[Callable[[str, float], None]] = None
+
+	def enable(self) -> None:
+		self.enabled = True
+
+	def disable(self) -> None:
+		self.enabled = False
+
+	def reset(self) -> None:
+		self._counters.clear()
+		self._histograms.clear()
+
+	def inc(self, name: str, value: float = 1) -> None:
+		if not self.enabled:
+			return
+		self._counters[name] = self._counters.get(name, 0) + value
+
+	def observe(self, name: str, seconds: float) -> None:
+		if not self.enabled:
+			return
+		h = self._histograms.get(name)
+		if h is None:
+			h = self._histograms[name] = Histogram()
+		h.observe(seconds)
+		if self._tracer is not None:
+			self._tracer(name, seconds)
+
+	def timed_call(self, name: str, fn: Callable, *args, **kwargs):
+		"""Call ``fn`` and record its latency under ``name``, for names known only at runtime."""
+		if not self.enabled:
+			return fn(*args, **kwargs)
+		start = time.perf_counter()
+		try:
+			return fn(*args, **kwargs)
+		finally:
+			self.observe(name, time.perf_counter() - start)
+
+	def set_tracer(self, tracer: Optional[Callable[[str, float], None]]) -> None:
+		"""Register a callable invoked as ``tracer(op, seconds)`` after each timed op."""
+		self._tracer = tracer
+
+	def start_profiling(self) -> None:
+		if self._profiler is not None:
+			return
+		self._profiler = cProfile.Profile()
+		self._profiler.enable()
+
+	def stop_profiling(self, limit: int = 20) -> str:
+		"""Stop the profiler and return the top ``limit`` entries by cumulative time."""
+		if self._profiler is None:
+			return ""
+		self._profiler.disable()
+		out = io.StringIO()
+		pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+		self._profiler = None
+		return out.getvalue()
+
+	def snapshot(self) -> dict:
+		return {
+			"counters": dict(self._counters),
+			"histograms": {k: h.snapshot() for k, h in self._histograms.items()},
+		}
+
+	def to_json(self) -> str:
+		return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+	def to_prometheus(self, prefix: str = "checkmygrade") -> str:
+		lines: List[str] = []
+		for name in sorted(self._counters):
+			metric = f"{prefix}_{_sanitize(name)}_total"
+			lines.append(f"# TYPE {metric} counter")
+			lines.append(f"{metric} {self._counters[name]}")
+		if self._histograms:
+			metric = f"{prefix}_op_seconds"
+			lines.append(f"# TYPE {metric} histogram")
+			for name in sorted(self._histograms):
+				h = self._histograms[name]
+				cumulative = 0
+				for b, c in zip(h.buckets, h.counts):
+					cumulative += c
+					lines.append(f'{metric}_bucket{{op="{name}",le="{b}"}} {cumulative}')
+				lines.append(f'{metric}_bucket{{op="{name}",le="+Inf"}} {h.count}')
+				lines.append(f'{metric}_sum{{op="{name}"}} {h.sum}')
+				lines.append(f'{metric}_count{{op="{name}"}} {h.count}')
+		return "\n".join(lines) + "\n"
+
+
+def _sanitize(name: str) -> str:
+	return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+METRICS = Metrics(enabled=os.environ.get("CHECKMYGRADE_METRICS") == "1")
+
+
+def instrumented(name: str):
+	"""Decorator recording the wrapped call's latency under ``name`` in METRICS."""
+
+	def decorator(fn):
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			if not METRICS.enabled:
+				return fn(*args, **kwargs)
+			start = time.perf_counter()
+			try:
+				return fn(*args, **kwargs)
+			finally:
+				METRICS.observe(name, time.perf_counter() - start)
+
+		return wrapper
+
+	return decorator
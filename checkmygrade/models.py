@@ -1,7 +1,32 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Any, ClassVar, Optional, Tuple
+
+_REQUIRED: Any = object()
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+	"""One persisted column: its name, scalar type, and how blanks are treated.
+
+	``optional`` fields store None as an empty cell; ``default`` is used when the
+	column is missing from a file. Fields without either are required.
+	"""
+
+	name: str
+	kind: type = str
+	optional: bool = False
+	default: Any = _REQUIRED
+
+	@property
+	def required(self) -> bool:
+		return not self.optional and self.default is _REQUIRED
+
+	@property
+	def fallback(self) -> Any:
+		"""Value used when the column is absent from a file."""
+		return None if self.default is _REQUIRED else self.default
 
 
 @dataclass
@@ -13,6 +38,15 @@ class Student:
 	grade: str
 	marks: float
 
+	SCHEMA: ClassVar[Tuple[FieldSpec, ...]] = (
+		FieldSpec("email_address"),
+		FieldSpec("first_name"),
+		FieldSpec("last_name"),
+		FieldSpec("course_id"),
+		FieldSpec("grade"),
+		FieldSpec("marks", float),
+	)
+
 	def key_email(self) -> str:
 		return self.email_address.lower()
 
@@ -24,6 +58,13 @@ class Course:
 	description: str = ""
 	credits: Optional[int] = None
 
+	SCHEMA: ClassVar[Tuple[FieldSpec, ...]] = (
+		FieldSpec("course_id"),
+		FieldSpec("course_name"),
+		FieldSpec("description", default=""),
+		FieldSpec("credits", int, optional=True),
+	)
+
 	def key_id(self) -> str:
 		return self.course_id.upper()
 
@@ -36,6 +77,14 @@ class Professor:
 	course_id: str
 	email_address: Optional[str] = None
 
+	SCHEMA: ClassVar[Tuple[FieldSpec, ...]] = (
+		FieldSpec("professor_id"),
+		FieldSpec("name"),
+		FieldSpec("rank"),
+		FieldSpec("course_id"),
+		FieldSpec("email_address", optional=True),
+	)
+
 	def key_id(self) -> str:
 		return self.professor_id.lower()
 
@@ -46,6 +95,12 @@ class Grade:
 	grade: str
 	marks_range: str
 
+	SCHEMA: ClassVar[Tuple[FieldSpec, ...]] = (
+		FieldSpec("grade_id"),
+		FieldSpec("grade"),
+		FieldSpec("marks_range"),
+	)
+
 	def key_id(self) -> str:
 		return self.grade_id.upper()
 
@@ -56,4 +111,10 @@ class LoginUser:
 	password_encrypted: str
 	role: str
 
+	SCHEMA: ClassVar[Tuple[FieldSpec, ...]] = (
+		FieldSpec("user_id"),
+		FieldSpec("password_encrypted"),
+		FieldSpec("role"),
+	)
+
 	# password handling occurs via crypto utilities, not here
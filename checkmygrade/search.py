@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import bisect
+import math
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+
+def _normalize(text: str) -> str:
+	return " ".join(text.casefold().split())
+
+
+def trigrams(text: str) -> FrozenSet[str]:
+	"""Word-padded trigrams (pg_trgm style): "ann" -> {"  a", " an", "ann", "nn "}."""
+	grams: Set[str] = set()
+	for word in text.casefold().split():
+		padded = f"  {word} "
+		grams |= {padded[i : i + 3] for i in range(len(padded) - 2)}
+	return frozenset(grams)
+
+
+def _jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+	if not a or not b:
+		return 0.0
+	shared = len(a & b)
+	return shared / (len(a) + len(b) - shared)
+
+
+class NameIndex:
+	"""Prefix and fuzzy lookup over first/last names, keyed by record key.
+
+	Prefix queries bisect a sorted list of ``(token, key)`` pairs, where the
+	tokens are the first name, the last name and "first last". Fuzzy queries
+	use an inverted trigram index and rank candidates by Jaccard similarity.
+	"""
+
+	def __init__(self, entries: Iterable[Tuple[str, str, str]] = ()):
+		self._tokens: Dict[str, Tuple[str, ...]] = {}
+		self._grams: Dict[str, Tuple[FrozenSet[str], ...]] = {}
+		self._sorted: List[Tuple[str, str]] = []
+		self._postings: Dict[str, Set[str]] = {}
+		for key, first, last in entries:
+			self._insert(key, first, last)
+		self._sorted.sort()
+
+	def __len__(self) -> int:
+		return len(self._tokens)
+
+	def __contains__(self, key: str) -> bool:
+		return key in self._tokens
+
+	def _insert(self, key: str, first: str, last: str) -> None:
+		first, last = _normalize(first), _normalize(last)
+		full = f"{first} {last}".strip()
+		if first and last:
+			first_grams, last_grams = trigrams(first), trigrams(last)
+			tokens = (first, last, full)
+			gram_sets = (first_grams, last_grams, first_grams | last_grams)
+		else:
+			tokens = (full,) if full else ()
+			gram_sets = (trigrams(full),) if full else ()
+		self._tokens[key] = tokens
+		self._grams[key] = gram_sets
+		self._sorted.extend([(t, key) for t in tokens])
+		# The full-name grams (last entry) are the union of all token grams.
+		for g in gram_sets[-1] if gram_sets else ():
+			keys = self._postings.get(g)
+			if keys is None:
+				self._postings[g] = {key}
+			else:
+				keys.add(key)
+
+	def add(self, key: str, first: str, last: str) -> None:
+		if key in self._tokens:
+			self.remove(key)
+		start = len(self._sorted)
+		self._insert(key, first, last)
+		new = self._sorted[start:]
+		del self._sorted[start:]
+		for pair in new:
+			bisect.insort(self._sorted, pair)
+
+	def remove(self, key: str) -> bool:
+		tokens = self._tokens.pop(key, None)
+		if tokens is None:
+			return False
+		for t in tokens:
+			i = bisect.bisect_left(self._sorted, (t, key))
+			if i < len(self._sorted) and self._sorted[i] == (t, key):
+				del self._sorted[i]
+		gram_sets = self._grams.pop(key)
+		for g in gram_sets[-1] if gram_sets else ():
+			keys = self._postings.get(g)
+			if keys is not None:
+				keys.discard(key)
+				if not keys:
+					del self._postings[g]
+		return True
+
+	def prefix(self, query: str, limit: int = 0) -> List[str]:
+		"""Keys whose first, last or full name starts with ``query``, in name order."""
+		q = _normalize(query)
+		if not q:
+			return []
+		out: Dict[str, None] = {}
+		i = bisect.bisect_left(self._sorted, (q, ""))
+		while i < len(self._sorted):
+			token, key = self._sorted[i]
+			if not token.startswith(q):
+				break
+			out[key] = None
+			if limit and len(out) >= limit:
+				break
+			i += 1
+		return list(out)
+
+	def fuzzy(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[Tuple[str, float]]:
+		"""Keys ranked by best trigram similarity of ``query`` to any name token."""
+		q = trigrams(query)
+		if not q:
+			return []
+		shared: Counter = Counter()
+		for g in q:
+			shared.update(self._postings.get(g, ()))
+		# Jaccard >= min_score requires at least min_score * |q| shared grams.
+		floor = math.ceil(min_score * len(q))
+		scored: List[Tuple[str, float]] = []
+		for key, n in shared.items():
+			if n < floor:
+				continue
+			score = max(_jaccard(q, g) for g in self._grams[key])
+			if score >= min_score:
+				scored.append((key, score))
+		scored.sort(key=lambda ks: (-ks[1], ks[0]))
+		return scored[:limit] if limit else scored
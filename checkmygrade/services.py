@@ -2,88 +2,196 @@ from __future__ import annotations
 
 import statistics
 import time
-from dataclasses import asdict
-from typing import Callable, Iterable, List, Optional, Tuple
+from dataclasses import asdict, replace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 from .models import Student, Course, Professor, Grade, LoginUser
 from .storage import StudentRepo, CourseRepo, ProfessorRepo, GradeRepo, LoginRepo
+from .cache import ResultCache
+from .changes import ChangeEvent, ChangeFeed
 from .crypto import encrypt_password, decrypt_password
+from .grading import GradingTable, RegradeResult
+from .metrics import METRICS, instrumented
+from .search import NameIndex
 
 
 class StudentService:
-	def __init__(self, repo: Optional[StudentRepo] = None):
+	def __init__(self, repo: Optional[StudentRepo] = None, result_cache_size: int = 256, result_cache_rows: int = 100_000):
 		self.repo = repo or StudentRepo()
 		self._cache = self.repo.load_all()
 		self._index = {s.key_email(): i for i, s in enumerate(self._cache)}
+		self.changes = ChangeFeed()
+		self._names = NameIndex((s.key_email(), s.first_name, s.last_name) for s in self._cache)
+		# Query results are keyed by data version: the service-wide counter for
+		# whole-table queries, per-course counters for course-scoped ones.
+		self._version = 0
+		self._course_versions: Dict[str, int] = {}
+		self._results = ResultCache(result_cache_size, name="student.results", max_weight=result_cache_rows)
 
 	def _persist(self) -> None:
 		self.repo.save_all(self._cache)
 
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		return self.changes.changes_since(epoch, seq)
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		return self.changes.subscribe(callback)
+
+	def _touch(self, *course_ids: str) -> None:
+		self._version += 1
+		for cid in course_ids:
+			cid = cid.upper()
+			self._course_versions[cid] = self._course_versions.get(cid, 0) + 1
+
+	def cache_stats(self) -> dict:
+		return self._results.stats()
+
+	@instrumented("student.add")
 	def add(self, student: Student) -> None:
 		key = student.key_email()
 		if not student.email_address or key in self._index:
 			raise ValueError("email must be unique and not null")
 		self._cache.append(student)
 		self._index[key] = len(self._cache) - 1
+		self._names.add(key, student.first_name, student.last_name)
+		self._touch(student.course_id)
 		self._persist()
+		self.changes.record("add", key, asdict(student))
 
+	@instrumented("student.delete")
 	def delete(self, email_address: str) -> bool:
 		key = email_address.lower()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
-		self._cache.pop(idx)
+		removed = self._cache.pop(idx)
 		self._index = {s.key_email(): i for i, s in enumerate(self._cache)}
+		self._names.remove(key)
+		self._touch(removed.course_id)
 		self._persist()
+		self.changes.record("delete", key, asdict(removed))
 		return True
 
+	@instrumented("student.update")
 	def update(self, email_address: str, **fields) -> bool:
 		key = email_address.lower()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
 		s = self._cache[idx]
+		old_course = s.course_id
 		for k, v in fields.items():
 			if hasattr(s, k):
 				setattr(s, k, v)
 		self._cache[idx] = s
+		if "first_name" in fields or "last_name" in fields:
+			self._names.add(key, s.first_name, s.last_name)
+		self._touch(old_course, s.course_id)
 		self._persist()
+		self.changes.record("update", key, asdict(s))
 		return True
 
+	@instrumented("student.find")
 	def find(self, predicate: Callable[[Student], bool]) -> List[Student]:
-		start = time.perf_counter()
-		results = [s for s in self._cache if predicate(s)]
-		elapsed = time.perf_counter() - start
-		return results  # timing printed by caller if needed
+		return [s for s in self._cache if predicate(s)]
 
 	def find_by_email(self, email_address: str) -> Optional[Student]:
 		return next((s for s in self._cache if s.key_email() == email_address.lower()), None)
 
+	@instrumented("student.search_prefix")
+	def search_name_prefix(self, prefix: str, limit: int = 0) -> List[Student]:
+		return [self._cache[self._index[k]] for k in self._names.prefix(prefix, limit)]
+
+	@instrumented("student.search_fuzzy")
+	def search_name_fuzzy(self, query: str, limit: int = 10, min_score: float = 0.3) -> List[Tuple[Student, float]]:
+		return [(self._cache[self._index[k]], score) for k, score in self._names.fuzzy(query, limit, min_score)]
+
+	@instrumented("student.sort")
 	def sort(self, key: Callable[[Student], object], reverse: bool = False) -> Tuple[List[Student], float]:
 		start = time.perf_counter()
 		result = sorted(self._cache, key=key, reverse=reverse)
 		elapsed = time.perf_counter() - start
 		return result, elapsed
 
+	@instrumented("student.stats")
 	def stats_for_course(self, course_id: str) -> Tuple[Optional[float], Optional[float]]:
-		marks = [s.marks for s in self._cache if s.course_id.upper() == course_id.upper()]
+		cid = course_id.upper()
+		cache_key = ("stats", cid, self._course_versions.get(cid, 0))
+		hit, value = self._results.get(cache_key)
+		if hit:
+			return value
+		marks = [s.marks for s in self._cache if s.course_id.upper() == cid]
 		if not marks:
-			return None, None
-		avg = sum(marks) / len(marks)
-		med = statistics.median(marks)
-		return avg, med
+			result: Tuple[Optional[float], Optional[float]] = (None, None)
+		else:
+			result = (sum(marks) / len(marks), statistics.median(marks))
+		self._results.put(cache_key, result)
+		return result
+
+	def _regrade(self, table: GradingTable, rows: List[Student]) -> RegradeResult:
+		letters = table.letters_for([s.marks for s in rows])
+		changed: List[Student] = []
+		ungraded = 0
+		for s, letter in zip(rows, letters):
+			if letter is None:
+				ungraded += 1
+			elif letter != s.grade:
+				s.grade = letter
+				changed.append(s)
+		METRICS.inc("student.ungraded", ungraded)
+		if changed:
+			self._touch(*{s.course_id for s in changed})
+			self._persist()
+			if len(changed) > self.changes.maxlen:
+				# would evict itself from the feed anyway; tell consumers to resync
+				self.changes.skip(len(changed))
+			else:
+				for s in changed:
+					self.changes.record("update", s.key_email(), asdict(s))
+		return RegradeResult(len(changed), ungraded)
+
+	@instrumented("student.regrade_all")
+	def regrade_all(self, table: GradingTable) -> RegradeResult:
+		"""Recompute every student's grade from ``table``; persists once.
+
+		Rows whose marks fall outside every band keep their grade and are
+		counted in ``ungraded``.
+		"""
+		return self._regrade(table, self._cache)
+
+	@instrumented("student.regrade_course")
+	def regrade_course(self, table: GradingTable, course_id: str) -> RegradeResult:
+		cid = course_id.upper()
+		return self._regrade(table, [s for s in self._cache if s.course_id.upper() == cid])
 
 	def report_by_student(self) -> List[dict]:
 		return [asdict(s) for s in self._cache]
 
+	def _cached_report(self, cache_key: tuple, rows: Callable[[], Iterable[Student]]) -> List[dict]:
+		hit, report = self._results.get(cache_key)
+		if not hit:
+			report = tuple(asdict(s) for s in rows())
+			# weighted by rows so large reports count against result_cache_rows
+			self._results.put(cache_key, report, weight=len(report))
+		# hand out copies so callers cannot mutate the cached rows
+		return [dict(r) for r in report]
+
 	def report_by_course(self, course_id: Optional[str] = None) -> List[dict]:
-		rows = [s for s in self._cache if not course_id or s.course_id.upper() == course_id.upper()]
-		return [asdict(s) for s in rows]
+		if not course_id:
+			return self._cached_report(("course", None, self._version), lambda: self._cache)
+		cid = course_id.upper()
+		return self._cached_report(
+			("course", cid, self._course_versions.get(cid, 0)),
+			lambda: (s for s in self._cache if s.course_id.upper() == cid),
+		)
 
 	def report_by_professor(self, professor_course_ids: Iterable[str]) -> List[dict]:
 		course_set = {c.upper() for c in professor_course_ids}
-		rows = [s for s in self._cache if s.course_id.upper() in course_set]
-		return [asdict(s) for s in rows]
+		versions = tuple((c, self._course_versions.get(c, 0)) for c in sorted(course_set))
+		return self._cached_report(
+			("professor", versions),
+			lambda: (s for s in self._cache if s.course_id.upper() in course_set),
+		)
 
 
 class CourseService:
@@ -91,10 +199,18 @@ class CourseService:
 		self.repo = repo or CourseRepo()
 		self._cache = self.repo.load_all()
 		self._index = {c.key_id(): i for i, c in enumerate(self._cache)}
+		self.changes = ChangeFeed()
 
 	def _persist(self) -> None:
 		self.repo.save_all(self._cache)
 
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		return self.changes.changes_since(epoch, seq)
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		return self.changes.subscribe(callback)
+
+	@instrumented("course.add")
 	def add(self, course: Course) -> None:
 		key = course.key_id()
 		if not course.course_id or key in self._index:
@@ -102,17 +218,21 @@ class CourseService:
 		self._cache.append(course)
 		self._index[key] = len(self._cache) - 1
 		self._persist()
+		self.changes.record("add", key, asdict(course))
 
+	@instrumented("course.delete")
 	def delete(self, course_id: str) -> bool:
 		key = course_id.upper()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
-		self._cache.pop(idx)
+		removed = self._cache.pop(idx)
 		self._index = {c.key_id(): i for i, c in enumerate(self._cache)}
 		self._persist()
+		self.changes.record("delete", key, asdict(removed))
 		return True
 
+	@instrumented("course.update")
 	def update(self, course_id: str, **fields) -> bool:
 		key = course_id.upper()
 		idx = self._index.get(key)
@@ -124,6 +244,7 @@ class CourseService:
 				setattr(c, k, v)
 		self._cache[idx] = c
 		self._persist()
+		self.changes.record("update", key, asdict(c))
 		return True
 
 	def all(self) -> List[Course]:
@@ -135,10 +256,18 @@ class ProfessorService:
 		self.repo = repo or ProfessorRepo()
 		self._cache = self.repo.load_all()
 		self._index = {p.key_id(): i for i, p in enumerate(self._cache)}
+		self.changes = ChangeFeed()
 
 	def _persist(self) -> None:
 		self.repo.save_all(self._cache)
 
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		return self.changes.changes_since(epoch, seq)
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		return self.changes.subscribe(callback)
+
+	@instrumented("professor.add")
 	def add(self, prof: Professor) -> None:
 		key = prof.key_id()
 		if not prof.professor_id or key in self._index:
@@ -146,17 +275,21 @@ class ProfessorService:
 		self._cache.append(prof)
 		self._index[key] = len(self._cache) - 1
 		self._persist()
+		self.changes.record("add", key, asdict(prof))
 
+	@instrumented("professor.delete")
 	def delete(self, professor_id: str) -> bool:
 		key = professor_id.lower()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
-		self._cache.pop(idx)
+		removed = self._cache.pop(idx)
 		self._index = {p.key_id(): i for i, p in enumerate(self._cache)}
 		self._persist()
+		self.changes.record("delete", key, asdict(removed))
 		return True
 
+	@instrumented("professor.update")
 	def update(self, professor_id: str, **fields) -> bool:
 		key = professor_id.lower()
 		idx = self._index.get(key)
@@ -168,6 +301,7 @@ class ProfessorService:
 				setattr(p, k, v)
 		self._cache[idx] = p
 		self._persist()
+		self.changes.record("update", key, asdict(p))
 		return True
 
 	def courses_for_professor(self, professor_id: str) -> List[str]:
@@ -179,39 +313,76 @@ class GradeService:
 		self.repo = repo or GradeRepo()
 		self._cache = self.repo.load_all()
 		self._index = {g.key_id(): i for i, g in enumerate(self._cache)}
+		self.changes = ChangeFeed()
+		self._table: Optional[GradingTable] = None
+		self._listeners: List[Callable[[GradingTable], object]] = []
 
-	def _persist(self) -> None:
+	def _persist(self, table: GradingTable, bands_changed: bool = True) -> None:
+		# ``table`` is compiled from the new band set before any mutation, so an
+		# invalid set is rejected without touching the cache or grades.csv.
 		self.repo.save_all(self._cache)
+		self._table = table
+		if bands_changed:
+			for listener in self._listeners:
+				listener(table)
+
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		return self.changes.changes_since(epoch, seq)
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		return self.changes.subscribe(callback)
 
+	def table(self) -> GradingTable:
+		"""Compiled marks -> letter lookup, rebuilt only after the bands change."""
+		if self._table is None:
+			self._table = GradingTable(self._cache)
+		return self._table
+
+	def on_change(self, listener: Callable[[GradingTable], object]) -> None:
+		"""Call ``listener(table)`` whenever a band is added, deleted, or its letter or range changes."""
+		self._listeners.append(listener)
+
+	@instrumented("grade.add")
 	def add(self, grade: Grade) -> None:
 		key = grade.key_id()
 		if not grade.grade_id or key in self._index:
 			raise ValueError("grade_id must be unique and not null")
+		table = GradingTable(self._cache + [grade])
 		self._cache.append(grade)
 		self._index[key] = len(self._cache) - 1
-		self._persist()
+		self._persist(table)
+		self.changes.record("add", key, asdict(grade))
 
+	@instrumented("grade.delete")
 	def delete(self, grade_id: str) -> bool:
 		key = grade_id.upper()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
-		self._cache.pop(idx)
+		table = GradingTable(g for i, g in enumerate(self._cache) if i != idx)
+		removed = self._cache.pop(idx)
 		self._index = {g.key_id(): i for i, g in enumerate(self._cache)}
-		self._persist()
+		self._persist(table)
+		self.changes.record("delete", key, asdict(removed))
 		return True
 
+	@instrumented("grade.update")
 	def update(self, grade_id: str, **fields) -> bool:
 		key = grade_id.upper()
 		idx = self._index.get(key)
 		if idx is None:
 			return False
 		g = self._cache[idx]
+		candidate = replace(g, **{k: v for k, v in fields.items() if hasattr(g, k)})
+		table = GradingTable(candidate if i == idx else other for i, other in enumerate(self._cache))
+		# only a new letter or range can change anyone's grade
+		bands_changed = (candidate.grade, candidate.marks_range) != (g.grade, g.marks_range)
 		for k, v in fields.items():
 			if hasattr(g, k):
 				setattr(g, k, v)
 		self._cache[idx] = g
-		self._persist()
+		self._persist(table, bands_changed)
+		self.changes.record("update", key, asdict(g))
 		return True
 
 
@@ -220,10 +391,18 @@ class AuthService:
 		self.repo = repo or LoginRepo()
 		self._cache = self.repo.load_all()
 		self._index = {u.user_id.lower(): i for i, u in enumerate(self._cache)}
+		self.changes = ChangeFeed()
 
 	def _persist(self) -> None:
 		self.repo.save_all(self._cache)
 
+	def changes_since(self, epoch: str, seq: int) -> List[ChangeEvent]:
+		return self.changes.changes_since(epoch, seq)
+
+	def subscribe(self, callback: Callable[[ChangeEvent], object]) -> Callable[[], None]:
+		return self.changes.subscribe(callback)
+
+	@instrumented("login.register")
 	def register(self, user_id: str, password_plain: str, role: str) -> None:
 		if not user_id or user_id.lower() in self._index:
 			raise ValueError("user_id must be unique and not null")
@@ -231,7 +410,9 @@ class AuthService:
 		self._cache.append(LoginUser(user_id=user_id, password_encrypted=enc, role=role))
 		self._index[user_id.lower()] = len(self._cache) - 1
 		self._persist()
+		self.changes.record("add", user_id.lower(), _login_event_row(self._cache[-1]))
 
+	@instrumented("login.login")
 	def login(self, user_id: str, password_plain: str) -> bool:
 		idx = self._index.get(user_id.lower())
 		if idx is None:
@@ -239,6 +420,7 @@ class AuthService:
 		u = self._cache[idx]
 		return decrypt_password(u.password_encrypted) == password_plain
 
+	@instrumented("login.change_password")
 	def change_password(self, user_id: str, new_password_plain: str) -> bool:
 		idx = self._index.get(user_id.lower())
 		if idx is None:
@@ -247,4 +429,12 @@ class AuthService:
 		u.password_encrypted = encrypt_password(new_password_plain)
 		self._cache[idx] = u
 		self._persist()
+		self.changes.record("update", user_id.lower(), _login_event_row(u))
 		return True
+
+
+def _login_event_row(user: LoginUser) -> dict:
+	# The stored password is reversibly encrypted; never hand it to feed consumers.
+	row = asdict(user)
+	del row["password_encrypted"]
+	return row
@@ -1,7 +1,9 @@
 import csv
+import dataclasses
 import os
-from typing import Dict, List, Optional, Iterable, Tuple
+from typing import Any, Callable, Dict, List, Optional, Iterable, Sequence, Tuple
 
+from .metrics import METRICS
 from .models import Student, Course, Professor, Grade, LoginUser
 
 _DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
@@ -19,175 +21,146 @@ def ensure_data_dir() -> None:
 	os.makedirs(_DATA_DIR, exist_ok=True)
 
 
-class StudentRepo:
-	FIELDS = ["email_address", "first_name", "last_name", "course_id", "grade", "marks"]
+class RowCodec:
+	"""Positional row encoder/decoder generated once from a model's SCHEMA.
+
+	``encode`` turns an instance into a tuple for ``csv.writer.writerows``.
+	``decoder(header)`` returns a function building an instance from a
+	``csv.reader`` row laid out as ``header``; decoders are compiled per
+	distinct header and reused.
+	"""
+
+	def __init__(self, model: type):
+		self.model = model
+		self.schema = model.SCHEMA
+		self.fields = [f.name for f in self.schema]
+		for name in self.fields:
+			if not name.isidentifier():
+				raise ValueError(f"{model.__name__}: field name {name!r} is not an identifier")
+		self._positional = self.fields == [f.name for f in dataclasses.fields(model)]
+		self.encode: Callable[[Any], Tuple] = self._compile_encoder()
+		self._decoders: Dict[Tuple[str, ...], Callable[[List[str]], Any]] = {}
+
+	def _compile_encoder(self) -> Callable[[Any], Tuple]:
+		parts = []
+		for f in self.schema:
+			if f.optional:
+				parts.append(f'"" if o.{f.name} is None else o.{f.name}')
+			else:
+				parts.append(f"o.{f.name}")
+		return eval(f"lambda o: ({', '.join(parts)},)", {})
+
+	def decoder(self, header: Sequence[str]) -> Callable[[List[str]], Any]:
+		key = tuple(header)
+		fn = self._decoders.get(key)
+		if fn is None:
+			fn = self._decoders[key] = self._compile_decoder(key)
+		return fn
+
+	def _compile_decoder(self, header: Tuple[str, ...]) -> Callable[[List[str]], Any]:
+		positions = {name: i for i, name in enumerate(header)}
+		namespace: Dict[str, Any] = {"_model": self.model}
+		args = []
+		for j, f in enumerate(self.schema):
+			i = positions.get(f.name)
+			if i is None:
+				if f.required:
+					raise ValueError(f"{self.model.__name__}: missing column {f.name!r}")
+				namespace[f"_d{j}"] = f.fallback
+				expr = f"_d{j}"
+			else:
+				cell = f"r[{i}]"
+				if f.kind is str:
+					conv = cell
+				else:
+					namespace[f"_k{j}"] = f.kind
+					conv = f"_k{j}({cell})"
+				expr = f"({conv} if {cell} else None)" if f.optional else conv
+			args.append(expr if self._positional else f"{f.name}={expr}")
+		n = len(header)
+		src = (
+			"def decode(r):\n"
+			f"\tif len(r) < {n}:\n"
+			f"\t\tr = r + [''] * ({n} - len(r))\n"
+			f"\treturn _model({', '.join(args)})\n"
+		)
+		exec(src, namespace)
+		return namespace["decode"]
+
+
+class CsvRepo:
+	"""CSV persistence for one model, driven by its RowCodec.
+
+	Subclasses set CODEC, NAME (metrics prefix) and PATH_ATTR (the CsvPaths
+	attribute used when no explicit path is given).
+	"""
+
+	CODEC: RowCodec
+	FIELDS: List[str]
+	NAME: str
+	PATH_ATTR: str
 
 	def __init__(self, path: Optional[str] = None):
-		self.path = path or CsvPaths.students
+		self.path = path or getattr(CsvPaths, self.PATH_ATTR)
 		ensure_data_dir()
 
-	def load_all(self) -> List[Student]:
-		if not os.path.exists(self.path):
-			return []
-		rows: List[Student] = []
-		with open(self.path, newline="", encoding="utf-8") as f:
-			for r in csv.DictReader(f):
-				rows.append(
-					Student(
-						email_address=r["email_address"],
-						first_name=r["first_name"],
-						last_name=r["last_name"],
-						course_id=r["course_id"],
-						grade=r["grade"],
-						marks=float(r["marks"]),
-					)
-				)
-		return rows
+	def load_all(self) -> List[Any]:
+		return METRICS.timed_call(f"{self.NAME}.load", self._load_all)
 
-	def save_all(self, students: Iterable[Student]) -> None:
-		ensure_data_dir()
-		with open(self.path, "w", newline="", encoding="utf-8") as f:
-			w = csv.DictWriter(f, fieldnames=self.FIELDS)
-			w.writeheader()
-			for s in students:
-				w.writerow(
-					{
-						"email_address": s.email_address,
-						"first_name": s.first_name,
-						"last_name": s.last_name,
-						"course_id": s.course_id,
-						"grade": s.grade,
-						"marks": f"{s.marks}",
-					}
-				)
-
-
-class CourseRepo:
-	FIELDS = ["course_id", "course_name", "description", "credits"]
-
-	def __init__(self, path: Optional[str] = None):
-		self.path = path or CsvPaths.courses
-		ensure_data_dir()
+	def save_all(self, items: Iterable[Any]) -> None:
+		METRICS.timed_call(f"{self.NAME}.persist", self._save_all, items)
 
-	def load_all(self) -> List[Course]:
+	def _load_all(self) -> List[Any]:
 		if not os.path.exists(self.path):
 			return []
-		rows: List[Course] = []
 		with open(self.path, newline="", encoding="utf-8") as f:
-			for r in csv.DictReader(f):
-				credits = int(r["credits"]) if r.get("credits") else None
-				rows.append(
-					Course(
-						course_id=r["course_id"],
-						course_name=r["course_name"],
-						description=r.get("description", ""),
-						credits=credits,
-					)
-				)
+			reader = csv.reader(f)
+			header = next(reader, None)
+			if header is None:
+				return []
+			rows = list(map(self.CODEC.decoder(header), filter(None, reader)))
+		METRICS.inc(f"{self.NAME}.rows_parsed", len(rows))
 		return rows
 
-	def save_all(self, courses: Iterable[Course]) -> None:
+	def _save_all(self, items: Iterable[Any]) -> None:
 		ensure_data_dir()
 		with open(self.path, "w", newline="", encoding="utf-8") as f:
-			w = csv.DictWriter(f, fieldnames=self.FIELDS)
-			w.writeheader()
-			for c in courses:
-				w.writerow(
-					{
-						"course_id": c.course_id,
-						"course_name": c.course_name,
-						"description": c.description,
-						"credits": c.credits if c.credits is not None else "",
-					}
-				)
-
-
-class ProfessorRepo:
-	FIELDS = ["professor_id", "name", "rank", "course_id", "email_address"]
+			w = csv.writer(f)
+			w.writerow(self.FIELDS)
+			w.writerows(map(self.CODEC.encode, items))
+			METRICS.inc(f"{self.NAME}.bytes_written", f.tell())
 
-	def __init__(self, path: Optional[str] = None):
-		self.path = path or CsvPaths.professors
-		ensure_data_dir()
-
-	def load_all(self) -> List[Professor]:
-		if not os.path.exists(self.path):
-			return []
-		rows: List[Professor] = []
-		with open(self.path, newline="", encoding="utf-8") as f:
-			for r in csv.DictReader(f):
-				rows.append(
-					Professor(
-						professor_id=r["professor_id"],
-						name=r["name"],
-						rank=r["rank"],
-						course_id=r["course_id"],
-						email_address=r.get("email_address") or None,
-					)
-				)
-		return rows
 
-	def save_all(self, professors: Iterable[Professor]) -> None:
-		ensure_data_dir()
-		with open(self.path, "w", newline="", encoding="utf-8") as f:
-			w = csv.DictWriter(f, fieldnames=self.FIELDS)
-			w.writeheader()
-			for p in professors:
-				w.writerow(
-					{
-						"professor_id": p.professor_id,
-						"name": p.name,
-						"rank": p.rank,
-						"course_id": p.course_id,
-						"email_address": p.email_address or "",
-					}
-				)
-
-
-class GradeRepo:
-	FIELDS = ["grade_id", "grade", "marks_range"]
+class StudentRepo(CsvRepo):
+	CODEC = RowCodec(Student)
+	FIELDS = CODEC.fields
+	NAME = "student"
+	PATH_ATTR = "students"
 
-	def __init__(self, path: Optional[str] = None):
-		self.path = path or CsvPaths.grades
-		ensure_data_dir()
 
-	def load_all(self) -> List[Grade]:
-		if not os.path.exists(self.path):
-			return []
-		rows: List[Grade] = []
-		with open(self.path, newline="", encoding="utf-8") as f:
-			for r in csv.DictReader(f):
-				rows.append(Grade(grade_id=r["grade_id"], grade=r["grade"], marks_range=r["marks_range"]))
-		return rows
+class CourseRepo(CsvRepo):
+	CODEC = RowCodec(Course)
+	FIELDS = CODEC.fields
+	NAME = "course"
+	PATH_ATTR = "courses"
 
-	def save_all(self, grades: Iterable[Grade]) -> None:
-		ensure_data_dir()
-		with open(self.path, "w", newline="", encoding="utf-8") as f:
-			w = csv.DictWriter(f, fieldnames=self.FIELDS)
-			w.writeheader()
-			for g in grades:
-				w.writerow({"grade_id": g.grade_id, "grade": g.grade, "marks_range": g.marks_range})
 
+class ProfessorRepo(CsvRepo):
+	CODEC = RowCodec(Professor)
+	FIELDS = CODEC.fields
+	NAME = "professor"
+	PATH_ATTR = "professors"
 
-class LoginRepo:
-	FIELDS = ["user_id", "password_encrypted", "role"]
 
-	def __init__(self, path: Optional[str] = None):
-		self.path = path or CsvPaths.logins
-		ensure_data_dir()
+class GradeRepo(CsvRepo):
+	CODEC = RowCodec(Grade)
+	FIELDS = CODEC.fields
+	NAME = "grade"
+	PATH_ATTR = "grades"
 
-	def load_all(self) -> List[LoginUser]:
-		if not os.path.exists(self.path):
-			return []
-		rows: List[LoginUser] = []
-		with open(self.path, newline="", encoding="utf-8") as f:
-			for r in csv.DictReader(f):
-				rows.append(LoginUser(user_id=r["user_id"], password_encrypted=r["password_encrypted"], role=r["role"]))
-		return rows
 
-	def save_all(self, users: Iterable[LoginUser]) -> None:
-		ensure_data_dir()
-		with open(self.path, "w", newline="", encoding="utf-8") as f:
-			w = csv.DictWriter(f, fieldnames=self.FIELDS)
-			w.writeheader()
-			for u in users:
-				w.writerow({"user_id": u.user_id, "password_encrypted": u.password_encrypted, "role": u.role})
+class LoginRepo(CsvRepo):
+	CODEC = RowCodec(LoginUser)
+	FIELDS = CODEC.fields
+	NAME = "login"
+	PATH_ATTR = "logins"
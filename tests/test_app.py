@@ -1,13 +1,19 @@
+import json
 import os
 import random
+import shutil
 import string
+import tempfile
 import time
 import unittest
 
 from checkmygrade.models import Student, Course, Professor, Grade
 from checkmygrade.services import StudentService, CourseService, ProfessorService, GradeService, AuthService
-from checkmygrade.storage import CsvPaths, ensure_data_dir
+from checkmygrade.storage import CsvPaths, GradeRepo, ProfessorRepo, ensure_data_dir
 from checkmygrade.crypto import encrypt_password, decrypt_password
+from checkmygrade.grading import GradingTable
+from checkmygrade.changes import ChangeFeed, ResyncRequired
+from checkmygrade.metrics import METRICS
 
 
 class CheckMyGradeTests(unittest.TestCase):
@@ -20,8 +26,10 @@ class CheckMyGradeTests(unittest.TestCase):
 		pass
 
 	def setUp(self):
-		# assign unique file paths per test run to ensure isolation
-		base_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+		# assign unique file paths per test run to ensure isolation; keep them
+		# out of the real data dir so test runs leave nothing behind
+		base_dir = tempfile.mkdtemp(prefix="checkmygrade-test-")
+		self.addCleanup(shutil.rmtree, base_dir, ignore_errors=True)
 		uniq = str(time.time_ns())
 		CsvPaths.students = os.path.join(base_dir, f"test_students_{uniq}.csv")
 		CsvPaths.courses = os.path.join(base_dir, f"test_courses_{uniq}.csv")
@@ -82,12 +90,224 @@ class CheckMyGradeTests(unittest.TestCase):
 		self.assertIsNotNone(med)
 		self.assertTrue(80.0 <= med <= 90.0)
 
+	def test_name_search(self):
+		self.students.add(Student("js@example.edu", "John", "Smith", "DATA200", "A", 90.0))
+		self.students.add(Student("jn@example.edu", "Joan", "Smythe", "DATA200", "B", 80.0))
+		self.students.add(Student("ak@example.edu", "Alice", "King", "DATA201", "A", 95.0))
+		self.assertEqual([s.email_address for s in self.students.search_name_prefix("jo")], ["jn@example.edu", "js@example.edu"])
+		self.assertEqual([s.email_address for s in self.students.search_name_prefix("john sm")], ["js@example.edu"])
+		ranked = self.students.search_name_fuzzy("Jon Smth")
+		self.assertEqual(ranked[0][0].email_address, "js@example.edu")
+		# index follows update/delete
+		self.assertTrue(self.students.update("ak@example.edu", last_name="Kingsley"))
+		self.assertEqual(len(self.students.search_name_prefix("kingsl")), 1)
+		self.assertTrue(self.students.delete("js@example.edu"))
+		self.assertEqual(self.students.search_name_prefix("john"), [])
+		# rebuilt from CSV on load
+		self.assertEqual(len(StudentService().search_name_prefix("smy")), 1)
+
+	def test_row_codecs(self):
+		self.courses.add(Course("DATA200", "Data Science", "Intro", 3))
+		self.courses.add(Course("DATA201", "Databases"))
+		self.assertEqual(CourseService().all(), self.courses.all())
+		with open(CsvPaths.courses, encoding="utf-8") as f:
+			self.assertEqual(f.read().splitlines(), ["course_id,course_name,description,credits", "DATA200,Data Science,Intro,3", "DATA201,Databases,,"])
+		# decoders follow the file's header order and fill absent optional columns
+		with open(CsvPaths.professors, "w", encoding="utf-8") as f:
+			f.write("name,professor_id,course_id,rank\nAnn Lee,ann@mycsu.edu,DATA200,Professor\n\n")
+		profs = ProfessorRepo().load_all()
+		self.assertEqual(profs, [Professor("ann@mycsu.edu", "Ann Lee", "Professor", "DATA200", None)])
+		with open(CsvPaths.grades, "w", encoding="utf-8") as f:
+			f.write("grade_id,grade\nG1,A\n")
+		with self.assertRaises(ValueError):
+			GradeRepo().load_all()
+
+	def test_change_feed(self):
+		seen = []
+		self.students.subscribe(seen.append)
+		epoch, start = self.students.changes.epoch, self.students.changes.seq
+		self.students.add(Student("f1@example.edu", "A", "B", "DATA200", "A", 90.0))
+		self.students.add(Student("f2@example.edu", "C", "D", "DATA200", "B", 80.0))
+		self.assertTrue(self.students.update("f1@example.edu", marks=91.0))
+		self.assertTrue(self.students.delete("f2@example.edu"))
+		events = self.students.changes_since(epoch, start)
+		self.assertEqual([(e.op, e.key) for e in events], [("add", "f1@example.edu"), ("add", "f2@example.edu"), ("update", "f1@example.edu"), ("delete", "f2@example.edu")])
+		self.assertEqual(events[2].row["marks"], 91.0)
+		self.assertEqual({e.epoch for e in events}, {epoch})
+		self.assertEqual([e.seq for e in events], list(range(start + 1, start + 5)))
+		self.assertEqual(seen, events)
+		self.assertEqual(self.students.changes_since(epoch, events[-1].seq), [])
+
+	def test_change_feed_subscriber_isolation(self):
+		def boom(event):
+			if event.row is not None:
+				event.row["marks"] = -5.0  # read-only payload
+			raise RuntimeError("consumer down")
+
+		seen = []
+		self.students.subscribe(boom)
+		unsubscribe = self.students.subscribe(seen.append)
+		epoch, start = self.students.changes.epoch, self.students.changes.seq
+		self.students.add(Student("f1@example.edu", "A", "B", "DATA200", "A", 90.0))
+		self.assertTrue(self.students.update("f1@example.edu", marks=91.0))
+		self.assertEqual(self.students.find_by_email("f1@example.edu").marks, 91.0)
+		events = self.students.changes_since(epoch, start)
+		self.assertEqual([e.op for e in events], ["add", "update"])
+		self.assertEqual(events[1].row["marks"], 91.0)
+		self.assertEqual(seen, events)
+		self.assertEqual(self.students.changes.subscriber_errors, 2)
+		self.assertIsInstance(self.students.changes.last_subscriber_error, TypeError)
+		unsubscribe()
+		self.students.add(Student("f2@example.edu", "C", "D", "DATA200", "B", 80.0))
+		self.assertEqual(len(seen), 2)
+
+	def test_change_feed_epoch_after_restart(self):
+		epoch = self.students.changes.epoch
+		self.students.add(Student("f1@example.edu", "A", "B", "DATA200", "A", 90.0))
+		held = self.students.changes.seq
+		restarted = StudentService()
+		restarted.add(Student("f2@example.edu", "C", "D", "DATA200", "B", 80.0))
+		restarted.add(Student("f3@example.edu", "E", "F", "DATA200", "C", 70.0))
+		self.assertGreater(restarted.changes.seq, held)
+		# a seq held across a restart is rejected rather than answered wrongly
+		with self.assertRaises(ResyncRequired):
+			restarted.changes_since(epoch, held)
+		self.assertEqual(len(restarted.changes_since(restarted.changes.epoch, 0)), 2)
+
+	def test_change_feed_eviction_and_skip(self):
+		feed = ChangeFeed(maxlen=2)
+		for i in range(3):
+			feed.record("add", f"k{i}")
+		self.assertEqual([e.key for e in feed.changes_since(feed.epoch, 1)], ["k1", "k2"])
+		with self.assertRaises(ResyncRequired):
+			feed.changes_since(feed.epoch, 0)
+		with self.assertRaises(ResyncRequired):
+			feed.changes_since(feed.epoch, feed.seq + 1)
+		resync = feed.skip(10)
+		self.assertEqual((resync.op, resync.seq), ("resync", 13))
+		with self.assertRaises(ResyncRequired):
+			feed.changes_since(feed.epoch, 3)
+		self.assertEqual(feed.changes_since(feed.epoch, feed.seq), [])
+
+	def test_result_cache(self):
+		self.students.add(Student("c1@example.edu", "A", "B", "DATA200", "A", 90.0))
+		self.students.add(Student("c2@example.edu", "C", "D", "DATA201", "B", 80.0))
+		self.assertEqual(self.students.stats_for_course("DATA200"), (90.0, 90.0))
+		self.assertEqual(self.students.stats_for_course("data200"), (90.0, 90.0))
+		report = self.students.report_by_professor(["DATA200", "DATA201"])
+		report[0]["marks"] = -1.0  # caller edits must not leak into the cache
+		again = self.students.report_by_professor(["data201", "data200"])
+		self.assertEqual(again, self.students.report_by_student())
+		self.assertEqual(json.loads(json.dumps(again)), again)
+		self.assertEqual(self.students.cache_stats()["hits"], 2)
+		# a write to DATA201 invalidates DATA201-scoped results only
+		self.assertTrue(self.students.update("c2@example.edu", marks=70.0))
+		self.assertEqual(self.students.stats_for_course("DATA200"), (90.0, 90.0))
+		self.assertEqual(self.students.report_by_course("DATA201")[0]["marks"], 70.0)
+		self.assertEqual(self.students.report_by_professor(["DATA200", "DATA201"])[1]["marks"], 70.0)
+		self.assertEqual(self.students.cache_stats()["hits"], 3)
+		small = StudentService(result_cache_size=1)
+		small.stats_for_course("DATA200")
+		small.stats_for_course("DATA201")
+		self.assertEqual(small.cache_stats()["size"], 1)
+		# every report, including the unfiltered one, is bounded by rows and size
+		self.assertEqual(len(StudentService(result_cache_size=0).report_by_course()), 2)
+		by_rows = StudentService(result_cache_rows=1)
+		self.assertEqual(len(by_rows.report_by_course()), 2)
+		self.assertEqual(by_rows.cache_stats()["weight"], 0)
+		by_rows.report_by_course("DATA200")
+		by_rows.report_by_course("DATA201")
+		self.assertEqual(by_rows.cache_stats()["weight"], 1)
+		self.assertEqual(len(by_rows.report_by_professor(["DATA200", "DATA201"])), 2)
+		self.assertEqual(by_rows.cache_stats()["weight"], 1)
+
+	def test_regrade(self):
+		self.grades.add(Grade("G1", "A", "90-100"))
+		self.grades.add(Grade("G2", "B", "80-89"))
+		self.grades.add(Grade("G3", "F", "0-79"))
+		self.students.add(Student("r1@example.edu", "A", "B", "DATA200", "F", 95.0))
+		self.students.add(Student("r2@example.edu", "C", "D", "DATA200", "A", 89.5))
+		self.students.add(Student("r3@example.edu", "E", "F", "DATA201", "A", 40.0))
+		table = self.grades.table()
+		self.assertEqual(self.students.regrade_course(table, "data200"), (2, 0))
+		self.assertEqual(self.students.find_by_email("r2@example.edu").grade, "B")
+		self.assertEqual(self.students.find_by_email("r3@example.edu").grade, "A")
+		self.assertEqual(self.students.regrade_all(table), (1, 0))
+		self.assertEqual(StudentService().find_by_email("r3@example.edu").grade, "F")
+		# band changes trigger an automatic regrade; no-op updates do not
+		self.grades.on_change(self.students.regrade_all)
+		fired = []
+		self.grades.on_change(fired.append)
+		self.assertTrue(self.grades.update("G1", grade="A"))
+		self.assertEqual(fired, [])
+		self.assertTrue(self.grades.update("G2", marks_range="85-89"))
+		self.assertEqual(self.students.find_by_email("r2@example.edu").grade, "B")
+		self.assertEqual(len(fired), 1)
+		self.assertTrue(self.grades.update("G1", marks_range="89-100"))
+		self.assertEqual(self.students.find_by_email("r2@example.edu").grade, "A")
+		with self.assertRaises(ValueError):
+			self.grades.add(Grade("G4", "C", "seventy"))
+		# an invalid band set is rejected before anything is written
+		with self.assertRaises(ValueError):
+			self.grades.add(Grade("G5", "A+", "89-100"))
+		with self.assertRaises(ValueError):
+			self.grades.update("G2", marks_range="89-95")
+		reloaded = GradeService()
+		self.assertEqual(len(reloaded.table()), 3)
+		self.assertEqual(reloaded.table().letter_for(86.0), "B")
+		# real gaps between bands are not filled by the band below
+		gappy = GradingTable([Grade("GA", "A", "90-100"), Grade("GF", "F", "0-59")])
+		self.assertIsNone(gappy.letter_for(75.0))
+		self.assertEqual(gappy.letter_for(59.0), "F")
+		self.students.add(Student("r4@example.edu", "G", "H", "DATA202", "B", 75.0))
+		self.assertEqual(self.students.regrade_course(gappy, "DATA202"), (0, 1))
+		self.assertEqual(self.students.find_by_email("r4@example.edu").grade, "B")
+		with self.assertRaises(ValueError):
+			GradingTable([Grade("GA", "A", "85-100"), Grade("GB", "B", "80-89")])
+		# "<" is exclusive, "<=" inclusive
+		self.assertIsNone(GradingTable([Grade("GF", "F", "<60")]).letter_for(60.0))
+		self.assertEqual(GradingTable([Grade("GF", "F", "<60")]).letter_for(59.9), "F")
+		self.assertEqual(GradingTable([Grade("GF", "F", "<=60")]).letter_for(60.0), "F")
+		below = GradingTable([Grade("GF", "F", "<60"), Grade("GD", "D", "60-69")])
+		self.assertEqual((below.letter_for(59.5), below.letter_for(60.0)), ("F", "D"))
+
+	def test_metrics(self):
+		METRICS.reset()
+		METRICS.enable()
+		try:
+			self.students.add(Student("m1@example.edu", "A", "B", "DATA200", "A", 90.0))
+			self.students.find(lambda s: s.marks > 50)
+			self.students.stats_for_course("DATA200")
+			table = GradingTable([Grade("GA", "A", "0-100")])
+			self.students.regrade_all(table)
+			self.students.regrade_course(table, "DATA200")
+			StudentService()
+		finally:
+			METRICS.disable()
+		snap = METRICS.snapshot()
+		self.assertEqual(snap["histograms"]["student.add"]["count"], 1)
+		self.assertEqual(snap["histograms"]["student.find"]["count"], 1)
+		self.assertIn("student.persist", snap["histograms"])
+		self.assertEqual(snap["histograms"]["student.regrade_all"]["count"], 1)
+		self.assertEqual(snap["histograms"]["student.regrade_course"]["count"], 1)
+		self.assertEqual(snap["counters"]["student.rows_parsed"], 1)
+		self.assertGreater(snap["counters"]["student.bytes_written"], 0)
+		prom = METRICS.to_prometheus()
+		self.assertIn('checkmygrade_op_seconds_count{op="student.add"} 1', prom)
+		self.assertIn("checkmygrade_student_rows_parsed_total 1", prom)
+		# disabled: nothing further recorded
+		self.students.add(Student("m2@example.edu", "A", "B", "DATA200", "A", 80.0))
+		self.assertEqual(METRICS.snapshot()["histograms"]["student.add"]["count"], 1)
+
 	def test_auth(self):
 		uid = "micheal@mycsu.edu"
 		self.auth.register(uid, "Welcome12#_", "professor")
 		self.assertTrue(self.auth.login(uid, "Welcome12#_"))
 		self.assertTrue(self.auth.change_password(uid, "NewPass!234"))
 		self.assertTrue(self.auth.login(uid, "NewPass!234"))
+		# the change feed never carries the (reversible) stored password
+		rows = [e.row for e in self.auth.changes_since(self.auth.changes.epoch, 0)]
+		self.assertEqual(rows, [{"user_id": uid, "role": "professor"}] * 2)
 
 
 if __name__ == "__main__":